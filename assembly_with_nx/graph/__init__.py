@@ -1,36 +1,63 @@
 import copy
+from collections import defaultdict
 
 import networkx as nx
 
-from .utils import overlap, show_graph, read_fragments, hamilton, calc_orientation, get_good_orientation
+from .utils import overlap, show_graph, read_fragments, hamilton, calc_orientation, get_good_orientation, \
+    remove_contained_fragments
 
 
 def build_overlap_graph(fragments):
     """Constructs an overlap graph based on a list of fragments (DNA reads).
     Determines the edges automatically by searching the largest overlapping suffix/prefix pairs for every
     combination of fragments. The weight of the edges is defined by the length of the overlapping string.
+    Duplicate fragments and fragments contained in another fragment are left out. The id of a node is the index of
+    its fragment in fragments.
     Args:
         fragments: A list of fragments. Each fragment is a string based on the alphabet {A, T, C, G}.
 
     Returns:
         An OverlapGraph object with edges and vertices.
     """
+    fragment_ids = remove_contained_fragments(fragments)
+
+    # Largest overlap length for every ordered pair of fragments (i, j)
+    overlap_lengths = {}
+
+    # For every possible overlap length, starting with the largest one, hash the prefixes of that length and look up
+    # the suffixes of the same length. The first length found for a pair is its largest overlap.
+    # Only fragments at least as long as the current overlap length take part. Ordering them by length keeps those
+    # in a growing block at the front, so short fragments are not touched while the lengths are still large.
+    by_length = sorted(fragment_ids, key=lambda index: len(fragments[index]), reverse=True)
+    active = 0
+    max_length = len(fragments[by_length[0]]) if by_length else 0
+    for length in range(max_length, 0, -1):
+        while active < len(by_length) and len(fragments[by_length[active]]) >= length:
+            active += 1
+        candidates = by_length[:active]
+
+        prefixes = defaultdict(list)
+        for j in candidates:
+            prefixes[fragments[j][:length]].append(j)
+
+        for i in candidates:
+            for j in prefixes.get(fragments[i][-length:], ()):
+                if i != j and (i, j) not in overlap_lengths:
+                    overlap_lengths[(i, j)] = length
+
+    # Every remaining fragment becomes a node, even if it does not overlap with any other fragment
+    nodes = [(i, {"read": fragments[i]}) for i in fragment_ids]
+
+    edges = []
+    for (i, j), length in sorted(overlap_lengths.items()):
+        edges.append((i, j, {"weight": length,
+                             "match": fragments[i][-length:],
+                             "pos_start": 0,
+                             "pos_end": length}))
+
     overlap_graph = nx.DiGraph()
-    for i, fragment in enumerate(fragments):
-        for j, _fragment in enumerate(fragments):
-            if i != j:
-                overlap_info = overlap(fragment, _fragment)
-                overlap_exists = overlap_info["weight"] != 0
-                if overlap_exists:
-                    overlap_graph.add_node(i, read=fragment)
-                    overlap_graph.add_node(j, read=_fragment)
-
-                    overlap_graph.add_edge(i,
-                                           j,
-                                           weight=overlap_info["weight"],
-                                           match=overlap_info["overlap"],
-                                           pos_start=overlap_info["prefix_start"],
-                                           pos_end=overlap_info["prefix_end"])
+    overlap_graph.add_nodes_from(nodes)
+    overlap_graph.add_edges_from(edges)
 
     return overlap_graph
 
@@ -52,8 +79,10 @@ def merge_fragments(overlap_graph: nx.DiGraph, source_id: int, sink_id: int, sli
 
 
 def assembly_greedy(overlap_graph: nx.DiGraph, print_only_result=False, print_graph=False):
-    """Merge vertices, starting with the vertex pairs connected by the edge with the highest weight. Then update all
-    edges accordingly. Repeat this step until no more vertices can be merged.
+    """Merge vertices, starting with the vertex pairs connected by the edge with the highest weight. An edge gets
+    merged if its source has no merged successor and its sink has no merged predecessor yet and both are not part of
+    the same sequence already. Sequences are tracked with a Union-Find structure, so every edge is looked at once.
+    Afterwards the graph contains one node per assembled sequence.
     Args:
         overlap_graph: The graph in which to assemble the fragments to a single sequence if possible.
         print_only_result: If set to True prints the resulting graph and stores it as a .pdf file.
@@ -67,77 +96,85 @@ def assembly_greedy(overlap_graph: nx.DiGraph, print_only_result=False, print_gr
         show_graph(edges=list(overlap_graph.edges(data=True)), vertices=list(overlap_graph.nodes(data=True)),
                    name=f"graph_{_p}")
 
-    while overlap_graph.number_of_edges() != 0:
-        max_edge = sorted(overlap_graph.edges(data=True), key=lambda e: e[2]["weight"])[-1]
-
-        old_source = max_edge[0]
-        old_sink = max_edge[1]
-
-        merged_fragment = merge_fragments(overlap_graph, source_id=old_source, sink_id=old_sink,
-                                          slice_positions=(max_edge[2]["pos_start"], max_edge[2]["pos_end"]))
-        _id_merged = max(overlap_graph.nodes()) + 1
-        merged_node = overlap_graph.add_node(
-            _id_merged,
-            read=merged_fragment
-        )
-
-        # Delete all outgoing edges from source
-        outgoing_edges = list(overlap_graph.out_edges(nbunch=old_source))
-        for source_node, sink_node in outgoing_edges:
-            overlap_graph.remove_edge(u=source_node, v=sink_node)
-
-        # If an edge from sink to source exists delete it
-        if overlap_graph.has_edge(old_sink, old_source):
-            overlap_graph.remove_edge(old_sink, old_source)
-
-        # All outgoing edges from sink node remain.
-
-        # Delete all incoming edges to sink node
-        incoming_edges = list(overlap_graph.in_edges(nbunch=old_sink))
-        for source_node, sink_node in incoming_edges:
-            overlap_graph.remove_edge(u=source_node, v=sink_node)
-
-        # Replace the ids of source node and sink node in all edges with the id of the new node and update
-        # the weights if necessary.
-
-        # Update the graph
-        for edge in list(overlap_graph.edges(data=True)):
-            if edge[1] == old_sink or edge[1] == old_source:
-                ov = overlap(overlap_graph.nodes[edge[0]]["read"], overlap_graph.nodes[_id_merged]["read"])
-
-                overlap_graph.remove_edge(edge[0], edge[1])
-                overlap_graph.add_edge(edge[0],
-                                       _id_merged,
-                                       weight=ov["weight"],
-                                       match=ov["overlap"],
-                                       pos_start=ov["prefix_start"],
-                                       pos_end=ov["prefix_end"])
-
-            if edge[0] == old_sink or edge[0] == old_source:
-                ov = overlap(overlap_graph.nodes[_id_merged]["read"], overlap_graph.nodes[edge[1]]["read"])
-
-                overlap_graph.remove_edge(edge[0], edge[1])
-                overlap_graph.add_edge(_id_merged,
-                                       edge[1],
-                                       weight=ov["weight"],
-                                       match=ov["overlap"],
-                                       pos_start=ov["prefix_start"],
-                                       pos_end=ov["prefix_end"])
-
-        # Delete sink and source from graph as a new node will be added to replace both
-        overlap_graph.remove_node(old_source)
-        overlap_graph.remove_node(old_sink)
+    # Union-Find over the nodes. Each set is one sequence of merged nodes.
+    parent = {node: node for node in overlap_graph.nodes()}
+    rank = dict.fromkeys(parent, 0)
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(root_one, root_two):
+        if rank[root_one] < rank[root_two]:
+            root_one, root_two = root_two, root_one
+        parent[root_two] = root_one
+        if rank[root_one] == rank[root_two]:
+            rank[root_one] += 1
+
+    # Merged edges: node -> (successor, edge data) and node -> predecessor
+    successors = {}
+    predecessors = {}
+
+    def assemble_sequences():
+        # Walk every chain of merged nodes from its first node and merge the fragments along the way
+        sequences = []
+        for node, data in overlap_graph.nodes(data=True):
+            if node in predecessors:
+                continue
+            sequence = data["read"]
+            current = node
+            while current in successors:
+                current, edge_data = successors[current]
+                sequence += overlap_graph.nodes[current]["read"][edge_data["pos_end"]:]
+            sequences.append((node, {"read": sequence}))
+        return sequences
+
+    def first_node(node):
+        while node in predecessors:
+            node = predecessors[node]
+        return node
+
+    # Heaviest edge first. Of several edges with the same weight the last one in edge order comes first, like it did
+    # when the graph was rewritten after every merge.
+    sorted_edges = list(reversed(sorted(overlap_graph.edges(data=True), key=lambda e: e[2]["weight"])))
+    for source, sink, data in sorted_edges:
+        if source in successors or sink in predecessors:
+            continue
+
+        root_source = find(source)
+        root_sink = find(sink)
+        if root_source == root_sink:
+            # Merging would close a cycle
+            continue
+
+        union(root_source, root_sink)
+        successors[source] = (sink, data)
+        predecessors[sink] = source
 
         _p += 1
         if print_graph:
-            show_graph(edges=list(overlap_graph.edges(data=True)), vertices=list(overlap_graph.nodes(data=True)),
-                       name=f"graph_{_p}")
+            # Show the sequences so far and the edges which could still be merged
+            open_edges = [(first_node(u), first_node(v), d) for u, v, d in sorted_edges
+                          if u not in successors and v not in predecessors and find(u) != find(v)]
+            show_graph(edges=open_edges, vertices=assemble_sequences(), name=f"graph_{_p}")
+
+        if len(successors) == len(parent) - 1:
+            # Everything is merged into a single sequence
+            break
+
+    sequences = assemble_sequences()
+
+    # Replace the content of the graph with the assembled sequences
+    overlap_graph.clear()
+    overlap_graph.add_nodes_from(sequences)
 
-    if overlap_graph.number_of_nodes() == 1:
-        return list(overlap_graph.nodes(data=True))[0][1]["read"]
-    elif overlap_graph.number_of_nodes() > 1:
+    if len(sequences) == 1:
+        return sequences[0][1]["read"]
+    elif len(sequences) > 1:
 
-        return list(overlap_graph.nodes(data=True))
+        return sequences
     else:
         raise ValueError("No nodes in the Graph left. That shouldn't happen!")
 
@@ -163,7 +200,7 @@ def assembly_hamilton(overlap_graph: nx.DiGraph, print_only_result=False, print_
     max_node_count = overlap_graph.number_of_nodes()
 
     for node in list(overlap_graph.nodes()):
-        none_or_hampath = hamilton(overlap_graph, max_node_count, node, path=[node], visited=[node])
+        none_or_hampath = hamilton(overlap_graph, max_node_count, node)
         hamiltonian_paths.append(none_or_hampath)
 
     # Clean from None types
@@ -1,7 +1,4 @@
-import copy
-
 import networkx as nx
-from graphviz import Digraph
 
 COMPLEMENTS = {
     "A": "T",
@@ -10,6 +7,8 @@ COMPLEMENTS = {
     "T": "A"
 }
 
+_COMPLEMENT_TABLE = str.maketrans(COMPLEMENTS)
+
 
 def read_fragments(filename: str):
     """Reads fragments from a given file.
@@ -19,11 +18,40 @@ def read_fragments(filename: str):
         fragments: A list of strings whereas every string is a fragment.
     """
     with open(filename, "r") as fd:
-        # Read fragments and remove linebreaks from string
-        fragments = [frag.strip() for frag in fd.readlines()]
+        # Read the whole file at once and split it at whitespace, which also drops linebreaks and empty lines
+        fragments = fd.read().split()
     return fragments
 
 
+def remove_contained_fragments(fragments: list):
+    """Determines the fragments which are neither a duplicate of nor contained in another fragment. Those fragments
+    do not add anything to the assembled sequence, but increase the number of overlaps to calculate.
+    Args:
+        fragments: A list of fragments.
+    Returns:
+        A sorted list of indices of the remaining fragments. For duplicates the first occurrence remains.
+    """
+    first_occurrence = {}
+    for i, fragment in enumerate(fragments):
+        first_occurrence.setdefault(fragment, i)
+
+    remaining = []
+    longer_fragments = ""
+    current_length = None
+    for fragment in sorted(first_occurrence, key=len, reverse=True):
+        if len(fragment) != current_length:
+            # Only strictly longer fragments can contain the current one. The separator prevents matches across two
+            # fragments.
+            longer_fragments = "\x00".join(remaining)
+            current_length = len(fragment)
+
+        if remaining and fragment in longer_fragments:
+            continue
+        remaining.append(fragment)
+
+    return sorted(first_occurrence[fragment] for fragment in remaining)
+
+
 def is_suffix(suffix: str, word: str):
     """Checks whether suffix is an actual suffix of a word.
     Args:
@@ -60,6 +88,15 @@ def weight(fragment_one, fragment_two):
     return overlap(fragment_one, fragment_two)["weight"]
 
 
+def _memoized_weight(weights: dict, fragment_one: str, fragment_two: str):
+    # The orientation calculation asks for the same pairs of fragments over and over again.
+    key = (fragment_one, fragment_two)
+    _weight = weights.get(key)
+    if _weight is None:
+        _weight = weights[key] = weight(fragment_one, fragment_two)
+    return _weight
+
+
 def complement(fragment: str):
     """Returns the complement of a given fragment.
     Args:
@@ -68,8 +105,7 @@ def complement(fragment: str):
     Returns:
         Complement of fragment.
     """
-    c = reversed([COMPLEMENTS[l] for l in list(fragment)])
-    return "".join(c)
+    return fragment.translate(_COMPLEMENT_TABLE)[::-1]
 
 
 def same(fragment_one: str, fragment_two: str):
@@ -84,28 +120,44 @@ def same(fragment_one: str, fragment_two: str):
     return max(weight(fragment_one, fragment_two), weight(fragment_two, fragment_one))
 
 
-def opp(fragment_one: str, fragment_two: str):
+def opp(fragment_one: str, fragment_two: str, complement_two: str = None):
     """Largest possible edge weight if fragment_one and complement of fragment_two belong to one orientation.
     Args:
         fragment_one: Fragment to read.
         fragment_two: Fragment to read.
+        complement_two: Complement of fragment_two, if it is already known.
 
     Returns:
         Largest possible edge weight.
     """
-    c_two = complement(fragment_two)
+    c_two = complement_two if complement_two is not None else complement(fragment_two)
 
     return max(weight(fragment_one, c_two), weight(c_two, fragment_one))
 
 
+def score_pair(fragment_one: str, fragment_two: str, complement_two: str, weights: dict = None):
+    """Calculates same and opp for a pair of fragments in one go, with at most four overlap calculations.
+    Args:
+        fragment_one: Fragment to read.
+        fragment_two: Fragment to read.
+        complement_two: Complement of fragment_two.
+        weights: Dictionary to memoize the weights of fragment pairs in. Only used for this call if not given.
+
+    Returns:
+        A tuple with the results of same(fragment_one, fragment_two) and opp(fragment_one, fragment_two).
+    """
+    if weights is None:
+        weights = {}
+    same_score = max(_memoized_weight(weights, fragment_one, fragment_two),
+                     _memoized_weight(weights, fragment_two, fragment_one))
+    opp_score = max(_memoized_weight(weights, fragment_one, complement_two),
+                    _memoized_weight(weights, complement_two, fragment_one))
+    return same_score, opp_score
+
+
 def _get_orientations_input(fragments: list):
-    combinations = []
-    for f in fragments:
-        _copy_fragments = copy.deepcopy(fragments)
-        _copy_fragments.remove(f)
-        _tuple = (f, _copy_fragments)
-        combinations.append(_tuple)
-    return combinations
+    complements = [complement(fragment) for fragment in fragments]
+    return [(i, fragments, complements) for i in range(len(fragments))]
 
 
 def get_good_orientation(fragments: list):
@@ -113,8 +165,10 @@ def get_good_orientation(fragments: list):
 
     orientations_with_weight = []
 
+    # The weights of fragment pairs are shared by all start fragments and dropped afterwards
+    weights = {}
     for _input in to_calculate:
-        orientation, _weight = calc_orientation(_input[0], _input[1])
+        orientation, _weight = calc_orientation(_input[0], _input[1], _input[2], weights)
         orientations_with_weight.append((orientation, _weight))
 
     max_weight_orientation, _w = sorted(orientations_with_weight, key=lambda e: e[1])[-1]
@@ -122,39 +176,73 @@ def get_good_orientation(fragments: list):
     return max_weight_orientation
 
 
-def calc_orientation(start_fragment: str, fragments: list):
+def calc_orientation(start_index: int, fragments: list, complements: list = None, weights: dict = None):
     """Calculate an orientation from a given start fragment and a list of fragments.
     Args:
-        start_fragment: Fragment to start with (first element in set O)
-        fragments: Fragments to check.
+        start_index: Index of the fragment to start with (first element in set O). If the fragment occurs several
+            times, its first occurrence is the one left out of the fragments to check.
+        fragments: Fragments to check. The list itself is not modified.
+        complements: The complements of fragments in the same order. Calculated if not given.
+        weights: Dictionary to memoize the weights of fragment pairs in, e.g. across several start fragments.
     Returns:
         Set of fragments which represents an Orientation.
     """
-    O = [start_fragment]
-    others = fragments
-
-    while others:
+    if complements is None:
+        complements = [complement(fragment) for fragment in fragments]
+    if weights is None:
+        weights = {}
+
+    O = [fragments[start_index]]
+
+    # Leave out the first copy of the start fragment, so duplicates are checked in the same order as before
+    skip_index = fragments.index(fragments[start_index])
+
+    sum_same = 0
+    sum_opp = 0
+    for i, fragment_to_test in enumerate(fragments):
+        if i == skip_index:
+            continue
+        complement_to_test = complements[i]
         sum_same = 0
         sum_opp = 0
-        fragment_to_test = others.pop(0)
         for fragment in O:
-            sum_same += same(fragment, fragment_to_test)
-            sum_same += same(fragment_to_test, fragment)
-
-            sum_opp += opp(fragment, fragment_to_test)
-            sum_opp += opp(fragment_to_test, fragment)
+            # same and opp are symmetric: an overlap of a fragment with the complement of another one is an overlap
+            # of the other fragment with the complement of the first one. Hence both directions score the same.
+            same_score, opp_score = score_pair(fragment, fragment_to_test, complement_to_test, weights)
+            sum_same += 2 * same_score
+            sum_opp += 2 * opp_score
         if sum_same < sum_opp:
-            O.append(complement(fragment_to_test))
+            O.append(complement_to_test)
         elif sum_opp <= sum_same:
             O.append(fragment_to_test)
     return O, sum_same + sum_opp
 
 
-def overlap(string_one: str, string_two: str):
+def failure_function(string: str):
+    """Computes the KMP failure function of a string.
+    Args:
+        string: String to compute the failure function for.
+
+    Returns:
+        A tuple whereas element i is the length of the largest proper prefix of string[:i + 1] which is also a suffix.
+    """
+    failure = [0] * len(string)
+    k = 0
+    for i in range(1, len(string)):
+        while k > 0 and string[i] != string[k]:
+            k = failure[k - 1]
+        if string[i] == string[k]:
+            k += 1
+        failure[i] = k
+    return tuple(failure)
+
+
+def overlap(string_one: str, string_two: str, failure_two: tuple = None):
     """Returns the largest prefix of string two that overlaps with a respective suffix from string one.
     Args:
         string_one: String providing suffixes for comparison.
         string_two: String providing prefixes for comparison.
+        failure_two: The failure function of string two, if it is already known. Calculated if not given.
 
     Returns:
         Dictionary with information about the overlapping prefix.
@@ -162,33 +250,34 @@ def overlap(string_one: str, string_two: str):
     len_s_one = len(string_one)
     len_s_two = len(string_two)
 
-    # Content of the tuple => (start_index, stop_index, string from start_index to stop_index)
     largest_overlap = {"suffix_string": string_one,
                        "prefix_string": string_two,
                        "overlap": None,
                        "weight": 0}
+
+    # Run string one through the KMP automaton of string two. The state after the last character is the length of
+    # the largest prefix of string two which is also a suffix of string one. An overlap can not be longer than string
+    # two and has to start with its first character, so scanning starts at the first occurrence of that character
+    # within the respective tail of string one. If there is none, there is no overlap at all.
     len_overlap = 0
-    # Iterate over every suffix from string one from right to left
-    for i in range(len_s_one, 0, -1):
-        # Current suffix from string one
-        current_suffix_one = string_one[i - 1:len_s_one]
-
-        # Iterate over every prefix of string two from left to right
-        for j in range(len_s_two + 1):
-            current_prefix_two = string_two[:j]
-            if current_suffix_one == current_prefix_two:
-                tmp_len = len(current_prefix_two)
-                if tmp_len > len_overlap:
-                    len_overlap = tmp_len
-
-                    largest_overlap["suffix_start"] = i - 1
-                    largest_overlap["suffix_end"] = len_s_one
-
-                    largest_overlap["prefix_start"] = 0
-                    largest_overlap["prefix_end"] = j
-
-                    largest_overlap["weight"] = tmp_len
-                    largest_overlap["overlap"] = current_suffix_one
+    start = string_one.find(string_two[0], max(len_s_one - len_s_two, 0)) if string_two else -1
+    if start != -1:
+        failure = failure_two if failure_two is not None else failure_function(string_two)
+        for character in string_one[start:]:
+            while len_overlap > 0 and (len_overlap == len_s_two or character != string_two[len_overlap]):
+                len_overlap = failure[len_overlap - 1]
+            if len_overlap < len_s_two and character == string_two[len_overlap]:
+                len_overlap += 1
+
+    if len_overlap > 0:
+        largest_overlap["suffix_start"] = len_s_one - len_overlap
+        largest_overlap["suffix_end"] = len_s_one
+
+        largest_overlap["prefix_start"] = 0
+        largest_overlap["prefix_end"] = len_overlap
+
+        largest_overlap["weight"] = len_overlap
+        largest_overlap["overlap"] = string_one[len_s_one - len_overlap:]
     return largest_overlap
 
 
@@ -203,44 +292,49 @@ def find_largest_overlaps(string_one, string_two):
     return two_overlaps_suffix_one, one_overlaps_suffix_two
 
 
-def hamilton(graph: nx.DiGraph, vertex_count, start_vertex, path=None, visited=None):
-    """Find a hamilton path in a given graph from a given starting vertex. Search by traversing the nodes.
+def hamilton(graph: nx.DiGraph, vertex_count, start_vertex):
+    """Find a hamilton path in a given graph from a given starting vertex. Search by traversing the nodes with an
+    iterative depth first search. Visited vertices are tracked as bits of a single integer.
     Args:
         graph: The graph to search in
         vertex_count: The total amount of vertices in the graph.
         start_vertex: The vertex to start the search from.
-        path: Variable to hold the path of vertices which form a potential hamiltonian path.
-        visited: A list of vertices that were already visited.
 
     Returns:
-        A list of lists, whereas each element is a list of Vertices which form a hamilton path.
+        A list of vertices which form a hamilton path or None if there is no such path from start_vertex.
     """
-    if visited is None:
-        visited = []
-
-    if path is None:
-        path = []
+    node_to_bit = {node: 1 << i for i, node in enumerate(graph.nodes())}
+    successors_of = {node: list(graph.successors(node)) for node in graph.nodes()}
 
-    # if start_vertex not in path:
-    #     path.append(start_vertex)
+    path = [start_vertex]
+    visited_mask = node_to_bit[start_vertex]
 
     if len(path) == vertex_count:
         return path
 
-    sucessor_vertices = graph.successors(start_vertex)
+    # Every element of the stack iterates over the successors of the respective vertex in path
+    stack = [iter(successors_of[start_vertex])]
+    while stack:
+        successor = next(stack[-1], None)
 
-    for successor in sucessor_vertices:
-        if successor not in set(visited):
+        if successor is None:
+            # Dead end. Step back to the previous vertex.
+            stack.pop()
+            visited_mask ^= node_to_bit[path.pop()]
+            continue
+
+        bit = node_to_bit[successor]
+        if not visited_mask & bit:
             # Then visit
-            visited.append(successor)
+            visited_mask |= bit
             path.append(successor)
-            candidate = hamilton(graph, vertex_count, successor, path, visited)
 
-            if candidate:
-                return candidate
+            if len(path) == vertex_count:
+                return path
+
+            stack.append(iter(successors_of[successor]))
 
-            visited.pop()
-            path.pop()
+    return None
 
 
 def show_graph(edges, vertices, name):
@@ -253,15 +347,14 @@ def show_graph(edges, vertices, name):
     Returns:
         None
     """
-    dot = Digraph(comment=name)
-
-    # Add vertices to directed graph
-    for v in vertices:
-        dot.node(str(v[0]), v[1]["read"])
+    # Imported here, so assembling does not depend on graphviz unless graphs get printed.
+    from graphviz import Source
 
-    # Add edges to directed graph
-    for i, e in enumerate(edges):
-        dot.edge(str(e[0]), str(e[1]), label=f"{str(e[2]['weight'])}: {e[2]['match']}")
+    # Build the DOT source in one go instead of adding every node and edge through a method call.
+    lines = [f"// {name}", "digraph {"]
+    lines += [f'\t{v[0]} [label="{v[1]["read"]}"]' for v in vertices]
+    lines += [f'\t{e[0]} -> {e[1]} [label="{e[2]["weight"]}: {e[2]["match"]}"]' for e in edges]
+    lines.append("}")
 
     # Render graph and show it in browser
-    dot.render(name, view=True)
+    Source("\n".join(lines) + "\n").render(name, view=True)
@@ -20,8 +20,7 @@ if __name__ == "__main__":
                              'picking the edges with the biggest weight and breaking ties arbitrarily.')
 
     parser.add_argument('--assemble_hamilton', action='store_true', default=False,
-                        help='NOTE: CURRENTLY NOT WORKING AS INTENDED! '
-                             'Assembles the fragments by building the overlap graph, finding a hamilton path with max '
+                        help='Assembles the fragments by building the overlap graph, finding a hamilton path with max '
                              'summed up weight. Then merges all nodes of the path together.')
 
     parser.add_argument('--random', action='store_true', default=True,
@@ -50,17 +49,20 @@ if __name__ == "__main__":
     # Load fragments from file
     fragments = graph.read_fragments(args.path)
 
-    # Build overlap graph
-    overlap_graph = graph.OverlapGraph.build_from_fragments(fragments=fragments)
+    def build_overlap_graph():
+        # Merging changes the graph, so every assembly method gets an overlap graph of its own
+        overlap_graph = graph.OverlapGraph.build_from_fragments(fragments=fragments)
 
-    # Only works with a valid installation of graphviz (see: https://graphviz.org/download/)
-    overlap_graph.set_print(print_graphs)
-    overlap_graph.set_print_result_only(print_only_result)
+        # Only works with a valid installation of graphviz (see: https://graphviz.org/download/)
+        overlap_graph.set_print(print_graphs)
+        overlap_graph.set_print_result_only(print_only_result)
 
-    overlap_graph.set_random(random)
+        overlap_graph.set_random(random)
+        return overlap_graph
 
     # - - - - - - Assembly - - - - - -
     if assemble_greedy:
+        overlap_graph = build_overlap_graph()
         assembled_sequence = overlap_graph.merge_by_arbitrary_tiebreaks()
         if isinstance(assembled_sequence, str):
             print(f"Resulting sequence: {assembled_sequence}")
@@ -71,7 +73,7 @@ if __name__ == "__main__":
                 print(f"Node {seq.id}: ", seq.value)
 
     if assemble_hamilton:
-        # NOTE: Broken does not work!
+        overlap_graph = build_overlap_graph()
         assembled_sequence = overlap_graph.merge_by_hamiltonian_path()
         if isinstance(assembled_sequence, str):
             print(f"Resulting sequence: {assembled_sequence}")
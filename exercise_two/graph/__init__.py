@@ -1,24 +1,30 @@
+import heapq
 import random
+from collections import Counter
 from typing import List
 
-from graphviz import Digraph
-
-from .utils import read_fragments, find_largest_overlaps, overlap, search_hamilton_path, hamilton, show_graph
+from .utils import read_fragments, find_largest_overlaps, overlap, search_hamilton_path, show_graph, show_dot, \
+    all_pairs_overlaps, remove_contained_fragments, hamilton_all_paths, max_weight_hamilton_path, failure_function
 
 
 class Vertex:
     """Class representing a single vertex of a graph.
     """
 
-    def __init__(self, id, value: str):
+    __slots__ = ("id", "value", "count", "_failure")
+
+    def __init__(self, id, value: str, count: int = 1):
         """Construct a vertex by passing an id a fragment and a list of edges.
         Args:
             id: A unique identifier.
             value: The value the vertex holds. in this case e.g. a DNA  (e.g. GATCGTACTGACT).
+            count: How often the value occurred in the input, e.g. the number of identical reads.
 
         """
         self.id = id
         self.value = value
+        self.count = count
+        self._failure = None
 
     def set_value(self, value: str):
         """Setter for the attribute Vertex.value.
@@ -29,6 +35,7 @@ class Vertex:
             None
         """
         self.value = value
+        self._failure = None
 
     def get_value(self):
         """Return the value of the respective node.
@@ -44,6 +51,15 @@ class Vertex:
         """
         return self.id
 
+    def get_failure(self):
+        """Returns the KMP failure function of the value. It is calculated on first use and kept with the vertex.
+        Returns:
+            A tuple as returned by utils.failure_function.
+        """
+        if self._failure is None:
+            self._failure = failure_function(self.value)
+        return self._failure
+
     def info(self):
         """Returns information about the vertex.
         Returns:
@@ -56,6 +72,8 @@ class Edge:
     """Class representing a single edge of a graph. An edge is defined by two adjacent vertices.
     """
 
+    __slots__ = ("id", "source", "sink", "weight", "match", "pos_start", "pos_end")
+
     def __init__(self, id: int, source: Vertex, sink: Vertex, weight=None, match=None, pos_start=None, pos_end=None):
         """Construct an edge of a directed graph.
         Args:
@@ -102,26 +120,6 @@ class Edge:
         self.pos_start = match_position[0]
         self.pos_end = match_position[1]
 
-    def set_sink(self, sink):
-        """Set the current sink to another vertex.
-        Args:
-            sink: A vertex type object.
-
-        Returns:
-            None
-        """
-        self.sink = sink
-
-    def set_source(self, source):
-        """Set the current source to another vertex.
-        Args:
-            source: A vertex type object.
-
-        Returns:
-            None
-        """
-        self.source = source
-
     def get_weight(self):
         """Getter returning the weight of the edge.
         Returns:
@@ -165,18 +163,51 @@ class OverlapGraph:
             edges: A list of elements of type Edge, representing the edges of a graph.
             vertices: A list of elements of type Vertex, representing the vertices of a graph.
         """
-        self.edges = edges if edges else []
-        self.vertices = vertices if vertices else []
+        edges = edges if edges else []
+        vertices = vertices if vertices else []
         self.random_tiebreak = random_tiebreak
 
         self.print_graph = print_graph
         self.print_only_result = print_only_result
 
+        # Next ids to assign. Ids are never reused, even if vertices or edges get removed.
+        self._next_vertex_id = max((vertex.id for vertex in vertices), default=0) + 1
+        self._next_edge_id = max((edge.id for edge in edges), default=0) + 1
+
+        # Vertices and edges by id, in insertion order. Removing from a dict takes constant time instead of scanning a
+        # list, so these hold the graph and the lists self.vertices and self.edges are built from them.
+        self._vertex_by_id = {vertex.id: vertex for vertex in vertices}
+        self._edge_by_id = {edge.id: edge for edge in edges}
+
+        # Adjacency of every vertex id: outgoing and incoming edges by edge id, in insertion order.
+        self._out = {}
+        self._in = {}
+        # Edge by the ids of its source and sink.
+        self._edge_by_endpoints = {}
+        for edge in edges:
+            self._out.setdefault(edge.source.id, {})[edge.id] = edge
+            self._in.setdefault(edge.sink.id, {})[edge.id] = edge
+            self._edge_by_endpoints.setdefault((edge.source.id, edge.sink.id), edge)
+
+    @property
+    def vertices(self):
+        """List of all vertices in the order they were added.
+        """
+        return list(self._vertex_by_id.values())
+
+    @property
+    def edges(self):
+        """List of all edges in the order they were added.
+        """
+        return list(self._edge_by_id.values())
+
     @staticmethod
     def build_from_fragments(fragments):
         """Constructs an overlap graph based on a list of fragments (DNA reads).
         Determines the edges automatically by searching the largest overlapping suffix/prefix pairs for every
         combination of fragments. The weight of the edges is defined by the length of the overlapping string.
+        Duplicate fragments and fragments contained in another one are left out, the number of identical reads is
+        kept in Vertex.count.
         Args:
             fragments: A list of fragments. Each fragment is a string based on the alphabet {A, T, C, G}.
 
@@ -185,8 +216,9 @@ class OverlapGraph:
         """
         graph = OverlapGraph()
 
-        for i, fragment in enumerate(fragments):
-            graph.add_vertex(value=fragment)
+        counts = Counter(fragments)
+        for i in remove_contained_fragments(fragments):
+            graph.add_vertex(value=fragments[i], count=counts[fragments[i]])
 
         graph.determine_edges()
         return graph
@@ -195,23 +227,37 @@ class OverlapGraph:
         """Determines the edges automatically by searching the largest overlapping suffix/prefix pairs for every
         combination of fragments. The weight of the edges is defined by the length of the overlapping string.
         Note:
-            String matching uses a naive approach by comparing each suffix and prefix of each string.
+            All overlaps are searched at once by hashing prefixes and suffixes of equal length, see
+            utils.all_pairs_overlaps.
         Returns:
             None
         """
-        for vertex in self.vertices:
-            for _vertex in self.vertices:
-                if vertex.id != _vertex.id:
-                    ov = overlap(vertex.get_value(), _vertex.get_value())
+        vertices = self.vertices
+        overlap_lengths = all_pairs_overlaps([vertex.value for vertex in vertices])
 
-                    if ov["weight"] != 0:
-                        self.add_edge(source=vertex,
-                                      sink=_vertex,
-                                      weight=ov["weight"],
-                                      match=ov["overlap"],
-                                      pos_start=ov["prefix_start"],
-                                      pos_end=ov["prefix_end"]
-                                      )
+        # Build all edges in one go instead of going through add_edge for every pair.
+        first_id = self._next_edge_id
+        new_edges = [Edge(id=first_id + k, source=vertices[i], sink=vertices[j], weight=length,
+                          match=vertices[i].value[-length:], pos_start=0, pos_end=length)
+                     for k, ((i, j), length) in enumerate(sorted(overlap_lengths.items()))]
+        self._next_edge_id += len(new_edges)
+
+        self._edge_by_id.update((edge.id, edge) for edge in new_edges)
+        for edge in new_edges:
+            self._out.setdefault(edge.source.id, {})[edge.id] = edge
+            self._in.setdefault(edge.sink.id, {})[edge.id] = edge
+            self._edge_by_endpoints.setdefault((edge.source.id, edge.sink.id), edge)
+
+    def iter_dot(self):
+        """Yields the vertices and edges of the graph for rendering in a single pass over the adjacency, every vertex
+        directly followed by its outgoing edges.
+        Returns:
+            Generator of tuples ("node", id, value) and ("edge", source id, sink id, weight).
+        """
+        for vertex_id, vertex in self._vertex_by_id.items():
+            yield "node", vertex_id, vertex.value
+            for edge in self._out.get(vertex_id, {}).values():
+                yield "edge", vertex_id, edge.sink.id, edge.weight
 
     @staticmethod
     def merge_fragments(source, sink, slice_positions):
@@ -224,65 +270,35 @@ class OverlapGraph:
         Returns:
             A string representing the merge fragments of source and sink.
         """
-        merged_reads = source.get_value() + sink.get_value()[slice_positions[1]:]
+        merged_reads = source.value + sink.value[slice_positions[1]:]
 
         return merged_reads
 
     def merge_by_hamiltonian_path(self):
-        """Merge nodes by first calculation the hamiltonian paths and pick one with the maximum summed up weight.
-        Then merge all nodes together.
-
-        Note:
-            CURRENTLY BROKEN. Hamilton path searching does not work!
-            # Todo:
-            1. Get search for hamiltonian paths done.
-            2. Update graph accordingly
-            3. Merge nodes of hamiltonian path to get the resulting DNA sequence.
+        """Merge nodes by first calculating the hamiltonian path with the maximum summed up weight, see
+        utils.max_weight_hamilton_path. Then merge all nodes of the path together.
 
         Returns:
-            The result sequence constructed from all given DNA fragments (reads)
+            The result sequence constructed from all given DNA fragments (reads). If there is no hamiltonian path, the
+            list of vertices is returned.
         """
-        hamiltonian_paths = self.get_all_hamilton_paths()
-        for i, g in enumerate(hamiltonian_paths):
-            r = self.find_edges_to_path(g)
-            dot = Digraph(comment='Overlap Graph')
-
-            # Add vertices to directed graph
-            for v in g:
-                dot.node(str(v.get_id()), v.get_value())
-
-            # Add edges to directed graph
-            for e in r:
-                dot.edge(str(e.source.get_id()), str(e.sink.get_id()), label=str(e.weight))
-
-            # Render graph and show it in browser
-            dot.render(f'overlap_graph{i}.gv', view=True)
-            print()
-        # Find hamilton path with max weight. The last element of a path is the summed up weight.
-        max_vertices, max_edges = sorted(hamiltonian_paths, key=lambda path: path[0][-1])[-1]
-        max_weight = max_vertices[-1]
-
-        all_max_weight_hampaths = [h for h in hamiltonian_paths if h[0][-1] == max_weight]
-
-        def merge_edges(edge_one, edge_two):
-            # Todo: Update Graph
-            overlap = OverlapGraph.merge_fragments(edge_one.source, edge_one.sink,
-                                                   slice_positions=(edge_one.pos_start, edge_one.pos_end))
-            ov = utils.overlap(overlap, edge_two.sink.value)
+        max_weight_path = max_weight_hamilton_path(self)
+        if max_weight_path is None:
+            return self.vertices
 
-            return Edge(id="", source=Vertex(id="", value=overlap), sink=edge_two.sink, weight=ov["weight"],
-                        match=ov["overlap"], pos_start=ov["prefix_start"], pos_end=ov["prefix_end"])
+        path, edges, _ = max_weight_path
 
-        final_sequence = None
+        if self.print_graph or self.print_only_result:
+            show_graph(edges=edges, vertices=path, name="overlap_graph.gv")
 
-        for _, edges in all_max_weight_hampaths:
+        # Append the vertices along the path. The sequence built so far may overlap more with the next fragment than
+        # the single preceding fragment does, so the overlap gets calculated again.
+        final_sequence = path[0].value
+        for edge in edges:
+            ov = overlap(final_sequence, edge.sink.value, edge.sink.get_failure())
+            final_sequence += edge.sink.value[ov["weight"]:]
 
-            while len(edges) > 1:
-                new_edge = merge_edges(edges[0], edges[1])
-                edges[0] = new_edge
-                edges.remove(edges[1])
-                if len(edges) == 2:
-                    print()
+        return final_sequence
 
     def find_edges_to_path(self, path: List[Vertex]):
         """Given a ordered list of vertices that represent a valid path in the graph, search for the according edges.
@@ -294,7 +310,7 @@ class OverlapGraph:
         """
 
         def find_edge(source, sink):
-            return next((edge for edge in self.edges if edge.sink.id == sink.id and edge.source.id == source.id), None)
+            return self._edge_by_endpoints.get((source.id, sink.id))
 
         all_edges = []
 
@@ -316,26 +332,43 @@ class OverlapGraph:
 
         if self.print_graph:
             print("Do I Print? ", self.print_graph)
-            edges = self.get_edges()
-            vertices = self.get_vertices()
-            show_graph(edges=edges, vertices=vertices, name=f"graph_{_p}")
+            show_dot(self.iter_dot(), name=f"graph_{_p}")
+
+        # Max-heap of the edges by weight, ties broken by the most recently added edge. Edges which were re-weighted
+        # get pushed again, entries of removed edges or with an outdated weight are skipped when popped.
+        heap = [(-edge.weight, -edge.id) for edge in self._edge_by_id.values()]
+        heapq.heapify(heap)
 
-        while self.edges:
-            max_edge = sorted(self.edges, key=lambda e: e.weight)[-1]
+        def pop_edge():
+            neg_weight, neg_id = heapq.heappop(heap)
+            edge = self._edge_by_id.get(-neg_id)
+            return edge if edge is not None and edge.weight == -neg_weight else None
+
+        while heap:
+            max_edge = pop_edge()
+            if max_edge is None:
+                continue
 
             if self.random_tiebreak:
                 #########
-                max_edges = [edge for edge in self.edges if edge.weight == max_edge.weight]
-                max_edge = random.choice(max_edges)
+                max_edges = {max_edge.id: max_edge}
+                while heap and heap[0][0] == -max_edge.weight:
+                    edge = pop_edge()
+                    if edge is not None:
+                        max_edges[edge.id] = edge
+                max_edge = random.choice(sorted(max_edges.values(), key=lambda e: e.id))
+                for edge in max_edges.values():
+                    if edge is not max_edge:
+                        heapq.heappush(heap, (-edge.weight, -edge.id))
                 #########
 
-            source = max_edge.get_source()
-            sink = max_edge.get_sink()
+            source = max_edge.source
+            sink = max_edge.sink
 
-            old_source_id = source.get_id()
-            old_sink_id = sink.get_id()
+            old_source_id = source.id
+            old_sink_id = sink.id
 
-            self.edges.remove(max_edge)
+            self.remove_edge(max_edge.id)
 
             merged_fragment = OverlapGraph.merge_fragments(source=source, sink=sink,
                                                            slice_positions=(max_edge.pos_start, max_edge.pos_end))
@@ -345,54 +378,84 @@ class OverlapGraph:
             # Delete all outgoing edges from source node
             source_outgoing = self.find_outgoing_edges(source)
             for edge in source_outgoing:
-                self.edges.remove(edge)
+                self.remove_edge(edge.id)
 
-            # All incoming edges to source node remain except edges from sink node
-            edges_to_remove = [edge for edge in self.edges if edge.sink.id == source.id and edge.source.id == sink.id]
-            for _edge in edges_to_remove:
-                self.edges.remove(_edge)
+            # All incoming edges to source node remain except the edge from sink node
+            edge_to_remove = self._edge_by_endpoints.get((sink.id, source.id))
+            if edge_to_remove is not None:
+                self.remove_edge(edge_to_remove.id)
 
             # All outgoing edges from sink node remain except for outgoing edge to source node.
 
             # Delete all incoming edges to sink node
             sink_incoming = self.find_incoming_edges(sink)
             for edge in sink_incoming:
-                self.edges.remove(edge)
-
-            self.vertices.remove(source)
-            self.vertices.remove(sink)
-
-            # Replace the ids of source node and sink node in all edges with the id of the new node and update
-            # the weights if necessary.
-
-            for i, edge in enumerate(self.edges):
-                if edge.sink.get_id() == old_sink_id or edge.sink.get_id() == old_source_id:
-                    self.edges[i].sink = merged_vertex
-
-                    ov = overlap(self.edges[i].source.get_value(), merged_vertex.get_value())
-
-                    self.edges[i].set_weight(ov["weight"])
-                    self.edges[i].set_match(ov["overlap"])
-                    self.edges[i].set_match_position((ov["prefix_start"], ov["prefix_end"]))
-
-                if edge.source.get_id() == old_sink_id or edge.source.get_id() == old_source_id:
-                    self.edges[i].source = merged_vertex
-
-                    ov = overlap(merged_vertex.get_value(), self.edges[i].sink.get_value())
-
-                    self.edges[i].set_weight(ov["weight"])
-                    self.edges[i].set_match(ov["overlap"])
-                    self.edges[i].set_match_position((ov["prefix_start"], ov["prefix_end"]))
+                self.remove_edge(edge.id)
+
+            self.remove_vertex(old_source_id)
+            self.remove_vertex(old_sink_id)
+
+            # Replace source node and sink node in all remaining edges with the new node and update the weights if
+            # necessary. Only the incoming edges of source node and the outgoing edges of sink node are left, so the
+            # adjacency of the new node is made up of exactly those.
+            self._in[merged_vertex.id] = self._in.pop(old_source_id, {})
+            self._out[merged_vertex.id] = self._out.pop(old_sink_id, {})
+            self._out.pop(old_source_id, None)
+            self._in.pop(old_sink_id, None)
+
+            # The new node starts with the value of source node and ends with the value of sink node. An overlap which
+            # is not longer than that value is therefore the same as before and only longer neighbours need a new
+            # overlap calculation.
+            merged_id = merged_vertex.id
+            merged_value = merged_vertex.value
+            source_length = len(source.value)
+            sink_length = len(sink.value)
+            edge_by_endpoints = self._edge_by_endpoints
+
+            for edge in self._in[merged_id].values():
+                edge.sink = merged_vertex
+                neighbour = edge.source
+                edge_by_endpoints.pop((neighbour.id, old_source_id), None)
+                edge_by_endpoints.setdefault((neighbour.id, merged_id), edge)
+                if len(neighbour.value) <= source_length:
+                    continue
+
+                ov = overlap(neighbour.value, merged_value, merged_vertex.get_failure())
+
+                edge.weight = ov["weight"]
+                edge.match = ov["overlap"]
+                edge.pos_start = ov["prefix_start"]
+                edge.pos_end = ov["prefix_end"]
+                heapq.heappush(heap, (-edge.weight, -edge.id))
+
+            for edge in self._out[merged_id].values():
+                edge.source = merged_vertex
+                neighbour = edge.sink
+                edge_by_endpoints.pop((old_sink_id, neighbour.id), None)
+                edge_by_endpoints.setdefault((merged_id, neighbour.id), edge)
+                if len(neighbour.value) <= sink_length:
+                    continue
+
+                ov = overlap(merged_value, neighbour.value, neighbour.get_failure())
+
+                edge.weight = ov["weight"]
+                edge.match = ov["overlap"]
+                edge.pos_start = ov["prefix_start"]
+                edge.pos_end = ov["prefix_end"]
+                heapq.heappush(heap, (-edge.weight, -edge.id))
             _p += 1
-            if self.print_only_result or self.print_graph:
-                edges = self.get_edges()
-                vertices = self.get_vertices()
-                show_graph(edges=edges, vertices=vertices, name=f"graph_{_p}")
-
-        if len(self.vertices) == 1:
-            return self.vertices[0].value
-        elif len(self.vertices) > 1:
-            return self.vertices
+            if self.print_graph:
+                show_dot(self.iter_dot(), name=f"graph_{_p}")
+
+        # The result is rendered once after merging. With print_graph the last state was already rendered.
+        if self.print_only_result and not self.print_graph:
+            show_dot(self.iter_dot(), name=f"graph_{_p}")
+
+        vertices = self.vertices
+        if len(vertices) == 1:
+            return vertices[0].value
+        elif len(vertices) > 1:
+            return vertices
         else:
             print("Something went wrong!?")
 
@@ -403,10 +466,10 @@ class OverlapGraph:
         Returns:
             A list of objects of type Edge.
         """
-        vertex_id = vertex.get_id()
+        outgoing = self._out.get(vertex.id, {})
         if only_id:
-            return [edge.id for edge in self.edges if edge.get_source().get_id() == vertex_id]
-        return [edge for edge in self.edges if edge.get_source().get_id() == vertex_id]
+            return list(outgoing)
+        return list(outgoing.values())
 
     def find_incoming_edges(self, vertex):
         """Find all edges leading to a vertex.
@@ -415,9 +478,7 @@ class OverlapGraph:
         Returns:
             A list of objects of type Edge.
         """
-        vertex_id = vertex.get_id()
-
-        return [edge for edge in self.edges if edge.get_sink().get_id() == vertex_id]
+        return list(self._in.get(vertex.id, {}).values())
 
     def add_edge(self, source, sink, weight, match, pos_start, pos_end):
         """Adds an edge to the graph.
@@ -431,26 +492,30 @@ class OverlapGraph:
         Returns:
             The id of the edge.
         """
-        edge_ids = self.get_edge_ids()
-        _id = 1 if not edge_ids else max(edge_ids) + 1
+        _id = self._next_edge_id
+        self._next_edge_id += 1
 
         edge = Edge(id=_id, source=source, sink=sink, weight=weight, match=match, pos_start=pos_start, pos_end=pos_end)
-        self.edges.append(edge)
+        self._edge_by_id[_id] = edge
+        self._out.setdefault(source.id, {})[_id] = edge
+        self._in.setdefault(sink.id, {})[_id] = edge
+        self._edge_by_endpoints.setdefault((source.id, sink.id), edge)
         return edge
 
-    def add_vertex(self, value):
+    def add_vertex(self, value, count=1):
         """Adds a vertex to the graph.
         Args:
             value: A value associated with the vertex.
+            count: How often the value occurred in the input.
 
         Returns:
             The id of the vertex.
         """
-        vertex_ids = self.get_vertex_ids()
-        _id = 1 if not vertex_ids else max(vertex_ids) + 1
+        _id = self._next_vertex_id
+        self._next_vertex_id += 1
 
-        vertex = Vertex(id=_id, value=value)
-        self.vertices.append(vertex)
+        vertex = Vertex(id=_id, value=value, count=count)
+        self._vertex_by_id[_id] = vertex
 
         return vertex
 
@@ -462,11 +527,14 @@ class OverlapGraph:
         Returns:
             True when removing was successful, False otherwise.
         """
-        try:
-            self.edges.remove(self.get_edge(id))
-            return True
-        except ValueError:
+        edge = self._edge_by_id.pop(id, None)
+        if edge is None:
             return False
+        self._out[edge.source.id].pop(id)
+        self._in[edge.sink.id].pop(id)
+        if self._edge_by_endpoints.get((edge.source.id, edge.sink.id)) is edge:
+            del self._edge_by_endpoints[(edge.source.id, edge.sink.id)]
+        return True
 
     def remove_vertex(self, id):
         """Removes an vertex with the given id from the graph.
@@ -476,11 +544,7 @@ class OverlapGraph:
         Returns:
             True when removing was successful, False otherwise.
         """
-        try:
-            self.edges.remove(self.get_edge(id))
-            return True
-        except ValueError:
-            return False
+        return self._vertex_by_id.pop(id, None) is not None
 
     def set_random(self, val: bool):
         """Setter. If this value is set to true the choice made in method self.merge_by_arbitrary_tiebreaks is random
@@ -521,7 +585,7 @@ class OverlapGraph:
         Returns:
             An object of type Edge. Returns None if id could not be found.
         """
-        return next((edge for edge in self.edges if edge.id == id), None)
+        return self._edge_by_id.get(id)
 
     def get_vertex(self, id):
         """Returns the vertex with a given id.
@@ -531,15 +595,15 @@ class OverlapGraph:
         Returns:
             An object of type Vertex. Returns None if id could not be found.
         """
-        return next((edge for edge in self.edges if edge.id == id), None)
+        return self._vertex_by_id.get(id)
 
     def get_vertex_ids(self):
         """Get a list of ids of all existing vertices.
         Returns:
             List of vertex ids.
         """
-        if self.vertices:
-            return [v.id for v in self.vertices]
+        if self._vertex_by_id:
+            return list(self._vertex_by_id)
         return None
 
     def get_edge_ids(self):
@@ -547,8 +611,8 @@ class OverlapGraph:
         Returns:
             List of edge ids.
         """
-        if self.edges:
-            return [e.id for e in self.edges]
+        if self._edge_by_id:
+            return list(self._edge_by_id)
         return None
 
     def get_edges(self):
@@ -570,18 +634,11 @@ class OverlapGraph:
         Returns:
             A list of strings whereas each string represents a read (fragment).
         """
-        return [vertex.get_value() for vertex in self.vertices]
+        return [vertex.value for vertex in self.vertices]
 
     def get_all_hamilton_paths(self):
         """Find all hamilton paths in the graph.
         Returns:
             A list of hamilton paths, whereas each element in the graph is a single vertex.
         """
-        hamiltonian_paths = []
-        vertex_count = len(self.vertices)
-        for vertex in self.vertices:
-            res = hamilton(self, vertex_count, vertex)
-
-            hamiltonian_paths.append(res)
-        # Remove None values
-        return [h for h in hamiltonian_paths if h is not None]
+        return hamilton_all_paths(self)
@@ -1,4 +1,5 @@
-from graphviz import Digraph
+import functools
+from collections import defaultdict
 
 
 def read_fragments(filename: str):
@@ -9,11 +10,40 @@ def read_fragments(filename: str):
         fragments: A list of strings whereas every string is a fragment.
     """
     with open(filename, "r") as fd:
-        # Read fragments and remove linebreaks from string
-        fragments = [frag.strip() for frag in fd.readlines()]
+        # Read the whole file at once and split it at whitespace, which also drops linebreaks and empty lines
+        fragments = fd.read().split()
     return fragments
 
 
+def remove_contained_fragments(fragments: list):
+    """Determines the fragments which are neither a duplicate of nor contained in another fragment. Those fragments
+    do not add anything to the assembled sequence, but increase the number of overlaps to calculate.
+    Args:
+        fragments: A list of fragments.
+    Returns:
+        A sorted list of indices of the remaining fragments. For duplicates the first occurrence remains.
+    """
+    first_occurrence = {}
+    for i, fragment in enumerate(fragments):
+        first_occurrence.setdefault(fragment, i)
+
+    remaining = []
+    longer_fragments = ""
+    current_length = None
+    for fragment in sorted(first_occurrence, key=len, reverse=True):
+        if len(fragment) != current_length:
+            # Only strictly longer fragments can contain the current one. The separator prevents matches across two
+            # fragments.
+            longer_fragments = "\x00".join(remaining)
+            current_length = len(fragment)
+
+        if remaining and fragment in longer_fragments:
+            continue
+        remaining.append(fragment)
+
+    return sorted(first_occurrence[fragment] for fragment in remaining)
+
+
 def is_suffix(suffix: str, word: str):
     """Checks whether suffix is an actual suffix of a word.
     Args:
@@ -38,48 +68,112 @@ def is_prefix(prefix: str, word: str):
     return word.startswith(prefix)
 
 
-def overlap(string_one: str, string_two: str):
+def failure_function(string: str):
+    """Computes the KMP failure function of a string. Vertex.get_failure keeps the result with the vertex, as every
+    fragment serves as prefix string for the overlap with several other fragments.
+    Args:
+        string: String to compute the failure function for.
+
+    Returns:
+        A tuple whereas element i is the length of the largest proper prefix of string[:i + 1] which is also a suffix.
+    """
+    failure = [0] * len(string)
+    k = 0
+    for i in range(1, len(string)):
+        while k > 0 and string[i] != string[k]:
+            k = failure[k - 1]
+        if string[i] == string[k]:
+            k += 1
+        failure[i] = k
+    return tuple(failure)
+
+
+def _overlap_length(string_one: str, string_two: str, failure_two: tuple = None):
+    len_s_one = len(string_one)
+    len_s_two = len(string_two)
+
+    # Run string one through the KMP automaton of string two, which takes linear time instead of comparing every
+    # suffix with every prefix. The state after the last character is the length of the largest overlap. An overlap
+    # can not be longer than string two and has to start with its first base, so scanning starts at the first
+    # occurrence of that base within the respective tail of string one.
+    len_overlap = 0
+    start = string_one.find(string_two[0], max(len_s_one - len_s_two, 0)) if string_two else -1
+    if start != -1:
+        failure = failure_two if failure_two is not None else failure_function(string_two)
+        for character in string_one[start:]:
+            while len_overlap > 0 and (len_overlap == len_s_two or character != string_two[len_overlap]):
+                len_overlap = failure[len_overlap - 1]
+            if len_overlap < len_s_two and character == string_two[len_overlap]:
+                len_overlap += 1
+    return len_overlap
+
+
+def overlap(string_one: str, string_two: str, failure_two: tuple = None):
     """Returns the largest prefix of string two that overlaps with a respective suffix from string one.
     Args:
         string_one: String providing suffixes for comparison.
         string_two: String providing prefixes for comparison.
+        failure_two: The failure function of string two, if it is already known. Calculated if not given.
 
     Returns:
         Dictionary with information about the overlapping prefix.
     """
     len_s_one = len(string_one)
-    len_s_two = len(string_two)
 
     # Content of the tuple => (start_index, stop_index, string from start_index to stop_index)
     largest_overlap = {"suffix_string": string_one,
                        "prefix_string": string_two,
                        "overlap": None,
                        "weight": 0}
-    len_overlap = 0
-    # Iterate over every suffix from string one from right to left
-    for i in range(len_s_one, 0, -1):
-        # Current suffix from string one
-        current_suffix_one = string_one[i - 1:len_s_one]
-
-        # Iterate over every prefix of string two from left to right
-        for j in range(len_s_two + 1):
-            current_prefix_two = string_two[:j]
-            if current_suffix_one == current_prefix_two:
-                tmp_len = len(current_prefix_two)
-                if tmp_len > len_overlap:
-                    len_overlap = tmp_len
-
-                    largest_overlap["suffix_start"] = i - 1
-                    largest_overlap["suffix_end"] = len_s_one
-
-                    largest_overlap["prefix_start"] = 0
-                    largest_overlap["prefix_end"] = j
-
-                    largest_overlap["weight"] = tmp_len
-                    largest_overlap["overlap"] = current_suffix_one
+
+    len_overlap = _overlap_length(string_one, string_two, failure_two)
+    if len_overlap > 0:
+        largest_overlap["suffix_start"] = len_s_one - len_overlap
+        largest_overlap["suffix_end"] = len_s_one
+
+        largest_overlap["prefix_start"] = 0
+        largest_overlap["prefix_end"] = len_overlap
+
+        largest_overlap["weight"] = len_overlap
+        largest_overlap["overlap"] = string_one[len_s_one - len_overlap:]
     return largest_overlap
 
 
+def all_pairs_overlaps(fragments: list):
+    """Searches the largest overlap for every ordered pair of fragments at once. For every possible overlap length,
+    starting with the largest one, the prefixes of that length are hashed and the suffixes of the same length are
+    looked up. The first length found for a pair is its largest overlap.
+    Args:
+        fragments: A list of strings.
+
+    Returns:
+        Dictionary mapping index pairs (i, j) to the length of the largest suffix of fragments[i] which is also a
+        prefix of fragments[j]. Pairs without an overlap are left out.
+    """
+    overlap_lengths = {}
+
+    # Only fragments at least as long as the current overlap length take part. Ordered by length, those form a
+    # growing block at the front, so short fragments are not touched while the lengths are still large.
+    by_length = sorted(range(len(fragments)), key=lambda index: len(fragments[index]), reverse=True)
+    active = 0
+    max_length = len(fragments[by_length[0]]) if by_length else 0
+    for length in range(max_length, 0, -1):
+        while active < len(by_length) and len(fragments[by_length[active]]) >= length:
+            active += 1
+        candidates = by_length[:active]
+
+        prefixes = defaultdict(list)
+        for j in candidates:
+            prefixes[fragments[j][:length]].append(j)
+
+        for i in candidates:
+            for j in prefixes.get(fragments[i][-length:], ()):
+                if i != j and (i, j) not in overlap_lengths:
+                    overlap_lengths[(i, j)] = length
+
+    return overlap_lengths
+
+
 def find_largest_overlaps(string_one, string_two):
     """Searches for overlaps between two strings.
     1. Compare all suffixes of string one with all prefixes of string two.
@@ -91,7 +185,8 @@ def find_largest_overlaps(string_one, string_two):
     return two_overlaps_suffix_one, one_overlaps_suffix_two
 
 
-def search_hamilton_path(graph, vertex_count, start_vertex, path=None, edges_visited=None, path_weight=None):
+def search_hamilton_path(graph, vertex_count, start_vertex, path=None, edges_visited=None, path_weight=None,
+                         visited_mask=0, vertex_bits=None):
     """Find a hamilton path in a given graph from a given starting vertex. Search by traversing the edges of the graph
     Args:
         graph: The graph to search in
@@ -100,11 +195,12 @@ def search_hamilton_path(graph, vertex_count, start_vertex, path=None, edges_vis
         path: Variable to hold the path of vertices which form a potential hamiltonian path.
         edges_visited: A list of edges already visited.
         path_weight: The summed up path weight of a path.
+        visited_mask: Bitmask of the vertices in path, see vertex_bits.
+        vertex_bits: Maps the id of every vertex to its bit in visited_mask. Built from graph.vertices if not given.
 
-    Note: # TODO
-        Currently Broken! Does not work as intended!
     Returns:
-        A list of lists, whereas each element is a list of Vertices which form a hamilton path.
+        A tuple of the path and the list of its edges, whereas the summed up path weight is appended as last element
+        of the path. None if there is no hamilton path from start_vertex.
     """
     if edges_visited is None:
         edges_visited = []
@@ -112,8 +208,12 @@ def search_hamilton_path(graph, vertex_count, start_vertex, path=None, edges_vis
     if path is None:
         path = []
 
-    if start_vertex not in path:
+    if vertex_bits is None:
+        vertex_bits = {vertex.id: 1 << i for i, vertex in enumerate(graph.vertices)}
+
+    if not visited_mask & vertex_bits[start_vertex.id]:
         path.append(start_vertex)
+        visited_mask |= vertex_bits[start_vertex.id]
 
     if path_weight is None:
         path_weight = 0
@@ -122,71 +222,140 @@ def search_hamilton_path(graph, vertex_count, start_vertex, path=None, edges_vis
         path.append(path_weight)
         return path, edges_visited
 
-    outgoing_edges = graph.find_outgoing_edges(start_vertex)
-
-    for visited in edges_visited:
-        if visited in outgoing_edges:
-            outgoing_edges.remove(visited)
-
-    if outgoing_edges:
-        for edge in outgoing_edges:
-            if edge not in edges_visited and edge.sink not in path:
-
-                edges_visited.append(edge)
-
-                path_weight += edge.weight
-
-                candidate = search_hamilton_path(graph, vertex_count, edge.sink, path, edges_visited, path_weight)
-
-                if candidate:
-                    return candidate
-    else:
+    # Every edge of the path leads to a vertex not visited before, so checking the sink also rules out visited edges.
+    for edge in graph.find_outgoing_edges(start_vertex):
+        if not visited_mask & vertex_bits[edge.sink.id]:
+            edges_visited.append(edge)
+
+            candidate = search_hamilton_path(graph, vertex_count, edge.sink, path, edges_visited,
+                                             path_weight + edge.weight, visited_mask, vertex_bits)
+
+            if candidate:
+                return candidate
+
+            # Dead end. Take the edge and its sink off the path again.
+            edges_visited.pop()
+            path.pop()
+
+
+def _hamilton_path_finder(graph, vertex_count):
+    # Whether the path can still be completed only depends on the set of visited vertices, kept as a bitmask, and the
+    # current vertex. It is computed once per state and shared between all paths searched with the returned function.
+    vertices = graph.get_vertices()
+    vertex_bits = {vertex.id: 1 << i for i, vertex in enumerate(vertices)}
+    successors = {vertex.id: [edge.sink for edge in graph.find_outgoing_edges(vertex)] for vertex in vertices}
+
+    @functools.lru_cache(maxsize=None)
+    def completable(visited, vertex_id):
+        # True if a path starting at the vertex can visit enough further vertices to reach vertex_count.
+        if bin(visited).count("1") == vertex_count:
+            return True
+        return any(completable(visited | vertex_bits[successor.id], successor.id)
+                   for successor in successors[vertex_id] if not visited & vertex_bits[successor.id])
+
+    def find_path(start_vertex):
+        visited = vertex_bits[start_vertex.id]
+        if not completable(visited, start_vertex.id):
+            return None
+
+        # Follow the first successor from which the path can be completed, just like a depth-first search does.
+        vertex = start_vertex
+        path = [vertex]
+        while len(path) < vertex_count:
+            vertex = next(successor for successor in successors[vertex.id]
+                          if not visited & vertex_bits[successor.id]
+                          and completable(visited | vertex_bits[successor.id], successor.id))
+            visited |= vertex_bits[vertex.id]
+            path.append(vertex)
+        return path
 
-        print("Dead end!")
+    return find_path
 
 
-def hamilton(graph, vertex_count, start_vertex, path=None, visited=None):
-    """Find a hamilton path in a given graph from a given starting vertex. Search by traversing the nodes.
+def hamilton(graph, vertex_count, start_vertex):
+    """Find a hamilton path in a given graph from a given starting vertex. Search by traversing the nodes, the visited
+    nodes are kept as a bitmask and states that were already explored are not searched again.
     Args:
         graph: The graph to search in
         vertex_count: The total amount of vertices in the graph.
         start_vertex: The vertex to start the search from.
-        path: Variable to hold the path of vertices which form a potential hamiltonian path.
-        visited: A list of vertices that were already visited.
-
-    Note: # TODO
-        Currently Broken! Does not work as intended!
 
     Returns:
-        A list of lists, whereas each element is a list of Vertices which form a hamilton path.
+        A list of Vertices which form a hamilton path or None if there is no such path from start_vertex.
     """
-    if visited is None:
-        visited = []
+    return _hamilton_path_finder(graph, vertex_count)(start_vertex)
 
-    if path is None:
-        path = []
 
-    if start_vertex not in path:
-        path.append(start_vertex)
-
-    if len(path) == vertex_count:
-        return path
+def hamilton_all_paths(graph):
+    """Find a hamilton path from every vertex of a given graph at once. The search states are shared between all
+    starting vertices instead of searching from scratch for each of them.
+    Args:
+        graph: The graph to search in
 
-    sucessor_vertices = [edge.sink for edge in graph.find_outgoing_edges(start_vertex)]
+    Returns:
+        A list of hamilton paths, one for every vertex a hamilton path starts from, in the order of the vertices. Each
+        path is a list of Vertices and the same path hamilton would find from that vertex.
+    """
+    vertices = graph.get_vertices()
+    find_path = _hamilton_path_finder(graph, len(vertices))
 
-    if sucessor_vertices:
-        for successor in sucessor_vertices:
-            if successor not in set(visited):
-                # Then visit
-                visited.append(successor)
+    paths = (find_path(vertex) for vertex in vertices)
+    return [path for path in paths if path is not None]
 
-                res_path = [element for element in path]  #
 
-                candidate = hamilton(graph, vertex_count, successor, res_path, visited)
+def max_weight_hamilton_path(graph):
+    """Find the hamilton path with the maximum summed up edge weight by a branch and bound search. Every vertex except
+    the first one of a path is entered by exactly one edge, so the sum of the heaviest incoming edge of each vertex not
+    visited yet bounds the weight a partial path can still gain. Partial paths which can not beat the best path found
+    so far get pruned. Successors are tried in order of descending edge weight to find good paths early.
+    Args:
+        graph: The graph to search in
 
-                if candidate:
-                    return candidate
-                print("Dead end!")
+    Returns:
+        A tuple (path, edges, weight) with the list of Vertices forming the path, the list of Edges connecting them
+        and the summed up weight. None if the graph has no hamilton path.
+    """
+    vertices = graph.get_vertices()
+    vertex_bits = {vertex.id: 1 << i for i, vertex in enumerate(vertices)}
+    all_visited = (1 << len(vertices)) - 1
+
+    outgoing = {vertex.id: sorted(graph.find_outgoing_edges(vertex), key=lambda edge: edge.weight, reverse=True)
+                for vertex in vertices}
+    max_incoming = {vertex.id: max((edge.weight for edge in graph.find_incoming_edges(vertex)), default=0)
+                    for vertex in vertices}
+    total_incoming = sum(max_incoming.values())
+
+    best = None
+    best_weight = None
+    # The current partial path. Vertices and edges get pushed when descending and popped when backtracking, so the
+    # path is only copied when it becomes the best one found so far.
+    path = []
+    edges = []
+
+    def search(vertex, visited, weight, bound):
+        nonlocal best, best_weight
+        if best_weight is not None and weight + bound <= best_weight:
+            return
+
+        if visited == all_visited:
+            best, best_weight = (list(path), list(edges), weight), weight
+            return
+
+        for edge in outgoing[vertex.id]:
+            sink_bit = vertex_bits[edge.sink.id]
+            if not visited & sink_bit:
+                path.append(edge.sink)
+                edges.append(edge)
+                search(edge.sink, visited | sink_bit, weight + edge.weight, bound - max_incoming[edge.sink.id])
+                path.pop()
+                edges.pop()
+
+    for start in vertices:
+        path.append(start)
+        search(start, vertex_bits[start.id], 0, total_incoming - max_incoming[start.id])
+        path.pop()
+
+    return best
 
 
 def show_graph(edges, vertices, name):
@@ -199,15 +368,32 @@ def show_graph(edges, vertices, name):
     Returns:
         None
     """
-    dot = Digraph(comment=name)
+    elements = [("node", v.id, v.value) for v in vertices]
+    elements += [("edge", e.source.id, e.sink.id, e.weight) for e in edges]
+    show_dot(elements, name)
+
 
-    # Add vertices to directed graph
-    for v in vertices:
-        dot.node(str(v.get_id()), v.get_value())
+def show_dot(elements, name):
+    """Prints a graph given as DOT elements out by utilizing the python graphviz interface.
+    Args:
+        elements: An iterable of tuples ("node", id, label) and ("edge", source id, sink id, weight), e.g. from
+            OverlapGraph.iter_dot.
+        name: The name of the file where the graph gets stored.
 
-    # Add edges to directed graph
-    for e in edges:
-        dot.edge(str(e.source.get_id()), str(e.sink.get_id()), label=str(e.weight))
+    Returns:
+        None
+    """
+    # Imported here, so assembling does not depend on graphviz unless graphs get printed.
+    from graphviz import Source
+
+    # Build the DOT source in one go instead of adding every node and edge through a method call.
+    lines = [f"// {name}", "digraph {"]
+    for element in elements:
+        if element[0] == "node":
+            lines.append(f'\t{element[1]} [label="{element[2]}"]')
+        else:
+            lines.append(f'\t{element[1]} -> {element[2]} [label="{element[3]}"]')
+    lines.append("}")
 
     # Render graph and show it in browser
-    dot.render(name, view=True)
+    Source("\n".join(lines) + "\n").render(name, view=True)